@@ -2,10 +2,11 @@ import dash
 from dash import DiskcacheManager, html, dcc, callback, Output, Input, State
 import dash_bootstrap_components as dbc
 import datetime
+import flask
 
-import helpers, deck_table, placements as _place
+import caches, conversions as _conv, deck_store, helpers, deck_table, placements as _place, trends as _trends
 
-background_callback_manager = DiskcacheManager(helpers.disk_cache)
+background_callback_manager = DiskcacheManager(caches.job_cache)
 app = dash.Dash(
     __name__,
     background_callback_manager=background_callback_manager,
@@ -31,6 +32,9 @@ skeleton = 'skeleton'
 skeleton_type = 'skeleton-type'
 placement_slider = 'placement-slider'
 placements = 'placements'
+trend_interval = 'trend-interval'
+trends = 'trends'
+conversion_table = 'conversion-table'
 table_clipboard = 'copy-to-clipboard'
 
 def layout():
@@ -55,7 +59,7 @@ def layout():
                 dbc.Button('Cancel', id=cancel, color='danger')
             ], class_name='mb-1'),
             dbc.Col(dbc.Progress(value=0, id=progress_bar), width=12),
-            dcc.Store(id=decks_store, data=[])
+            dcc.Store(id=decks_store, data=deck_store.empty_store())
         ]),
         dbc.Row([
             html.H3('Deck filters'),
@@ -72,7 +76,7 @@ def layout():
                 dcc.Slider(
                     id=placement_slider,
                     min=1, max=16, step=None, value=16,
-                    marks={16: 'T16', 8: 'T8', 4: 'T4', 2: 'Finals', 1: 'Winner'}
+                    marks=_conv.placement_buckets
                 )
             ], width=6),
         ], id=filters),
@@ -86,6 +90,22 @@ def layout():
             dbc.Label('Showing % of available decks'),
             dbc.Progress(id=inclusion_rate, value=0, color='danger'),
             dcc.Graph(id=placements, config={'displayModeBar': False}),
+            html.Span(dbc.RadioItems(
+                id=trend_interval,
+                className='btn-group',
+                inputClassName='btn-check',
+                labelClassName='btn btn-outline-primary',
+                labelCheckedClassName='active',
+                options=[
+                    {'label': 'Daily', 'value': 'D'},
+                    {'label': 'Weekly', 'value': 'W'},
+                ],
+                value='D',
+            ), className='radio-group'),
+            dcc.Graph(id=trends, config={'displayModeBar': False}),
+            html.H4('Card conversion rates'),
+            dbc.Label('Share of decks playing each card that reached each placement'),
+            html.Div(id=conversion_table, className='mb-1'),
             dbc.Button(dcc.Clipboard(id=table_clipboard, content='None'), className='me-1', title='Copy Skeleton Decklist'),
             html.Span(dbc.RadioItems(
                 id=skeleton_type,
@@ -113,6 +133,7 @@ app.layout = layout
     Input(fetch_decks, 'n_clicks'),
     State(select_dates, 'start_date'),
     State(select_dates, 'end_date'),
+    State(decks_store, 'data'),
     running=[
         (Output(progress_bar, 'striped'), True, False),
         (Output(progress_bar, 'animated'), True, False),
@@ -126,22 +147,14 @@ app.layout = layout
     progress=[Output(progress_bar, 'value')],
     cancel=[Input(cancel, 'n_clicks')]
 )
-def update_decks(set_progress, n, start, end):
+def update_decks(set_progress, n, start, end, store):
     if n is None:
         raise dash.exceptions.PreventUpdate
-    tours = helpers.get_tournaments_paginate()
-    total_tours = len(tours)
-    decks = []
-    for i, tour in enumerate(tours):
-        set_progress((i+1)/total_tours * 100)
-        tour_date_str = tour['date']
-        tour_date_obj = datetime.datetime.strptime(tour_date_str, '%d %b %y')
-        tour_date = tour_date_obj.strftime('%Y-%m-%d')
-        if tour_date > end or tour_date < start:
-            continue
-        decklists = helpers.get_tour_decklists(tour['url'])
-        decks.extend(decklists)
-    return decks
+    tours = deck_store.select_tours(deck_store.list_tournaments(), start, end)
+    return deck_store.update_store(
+        store, tours,
+        on_progress=lambda done, total: set_progress(done/total * 100)
+    )
 
 
 @callback(
@@ -149,13 +162,8 @@ def update_decks(set_progress, n, start, end):
     Output(exclude_cards, 'options'),
     Input(decks_store, 'data')
 )
-def update_card_options(decks):
-    cards = {}
-    for deck in decks:
-        decklist = deck['decklist']
-        for card in decklist:
-            id = f'{card.get("set")}-{card.get("number")}'
-            cards[id] = f'{card.get("name")} {id}'
+def update_card_options(store):
+    cards = {id: card['label'] for id, card in store['cards'].items()}
     return cards, cards
 
 
@@ -193,7 +201,9 @@ def check_decklist(dl, include, exclude):
     background=True,
     progress=[Output(progress_analysis, 'value'), Output(progress_analysis, 'label')]
 )
-def update_filter_store(set_progress, decks, include, exclude, skel_type, min_place):
+def update_filter_store(set_progress, store, include, exclude, skel_type, min_place):
+    set_progress((5, 'Loading decks...'))
+    decks = deck_store.get_decks(store)
     set_progress((15, 'Filtering data...'))
     filtered = [d for d in decks if check_decklist(d['decklist'], include, exclude) and d['placing'] <= min_place]
 
@@ -217,7 +227,45 @@ def update_filter_store(set_progress, decks, include, exclude, skel_type, min_pl
     return len(filtered), percent_inc * 100, f'{percent_inc:.1%}', place_out, output, skeleton_list
 
 
+@callback(
+    Output(trends, 'figure'),
+    Input(decks_store, 'data'),
+    Input(include_cards, 'value'),
+    Input(trend_interval, 'value'),
+    running=[
+        (Output(trend_interval, 'disabled'), True, False)
+    ],
+    background=True
+)
+def update_trends(store, include, interval):
+    if store['total'] == 0:
+        raise dash.exceptions.PreventUpdate
+    trend_data = _trends.compute_trends(deck_store.get_trend_counts(store), interval)
+    return _trends.create_trend_graph(trend_data, include)
+
+
+@callback(
+    Output(conversion_table, 'children'),
+    Input(decks_store, 'data'),
+    background=True
+)
+def update_conversions(store):
+    if store['total'] == 0:
+        raise dash.exceptions.PreventUpdate
+    conversion_counts = deck_store.get_conversions(store)
+    if conversion_counts is None:
+        raise dash.exceptions.PreventUpdate
+    counts, totals = conversion_counts
+    rates, baseline = _conv.conversion_rates(counts, totals)
+    return _conv.create_conversion_table(rates, baseline)
+
+
 server = app.server
 
+
+@server.route('/cache-stats')
+def cache_stats():
+    return flask.jsonify(caches.cache_stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
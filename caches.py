@@ -0,0 +1,77 @@
+import os
+from diskcache import Cache
+
+# scraped tournaments are expensive to fetch again, so they get most of
+# the space and are evicted by last access
+scraped_cache_dir = os.environ.get('SCRAPED_CACHE_DIR', '.cache')
+scraped_cache_size = int(os.environ.get('SCRAPED_CACHE_SIZE', 2 * 2**30))
+scraped_cache_eviction = os.environ.get('SCRAPED_CACHE_EVICTION', 'least-recently-used')
+
+# background job progress and results are only read once by the client
+job_cache_dir = os.environ.get('JOB_CACHE_DIR', '.cache-jobs')
+job_cache_size = int(os.environ.get('JOB_CACHE_SIZE', 256 * 2**20))
+job_cache_eviction = os.environ.get('JOB_CACHE_EVICTION', 'least-recently-stored')
+job_cache_expire = int(os.environ.get('JOB_CACHE_EXPIRE', 60 * 60))
+
+
+class ExpiringCache(Cache):
+    """ diskcache Cache that expires entries after `default_expire` seconds
+
+    Dash's `DiskcacheManager` stores progress and results without an expire
+    time, so results of jobs the client never collected would otherwise
+    stay until they are evicted.
+    """
+
+    def __init__(self, directory, default_expire, **settings):
+        super().__init__(directory, **settings)
+        self.default_expire = default_expire
+
+    def set(self, key, value, expire=None, read=False, tag=None, retry=False):
+        if expire is None:
+            expire = self.default_expire
+        return super().set(key, value, expire=expire, read=read, tag=tag, retry=retry)
+
+    # background jobs receive a pickled copy of the cache
+    def __getstate__(self):
+        return super().__getstate__(), self.default_expire
+
+    def __setstate__(self, state):
+        state, default_expire = state
+        super().__init__(*state)
+        self.default_expire = default_expire
+
+
+scraped_cache = Cache(
+    scraped_cache_dir,
+    size_limit=scraped_cache_size,
+    eviction_policy=scraped_cache_eviction,
+    statistics=True
+)
+job_cache = ExpiringCache(
+    job_cache_dir,
+    job_cache_expire,
+    size_limit=job_cache_size,
+    eviction_policy=job_cache_eviction,
+    statistics=True
+)
+
+tiers = {
+    'scraped': scraped_cache,
+    'jobs': job_cache
+}
+
+
+def cache_stats():
+    """ hits, misses and size of each cache tier """
+    stats = {}
+    for name, cache in tiers.items():
+        hits, misses = cache.stats()
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'entries': len(cache),
+            'bytes': cache.volume(),
+            'size_limit': cache.size_limit,
+            'eviction_policy': cache.eviction_policy
+        }
+    return stats
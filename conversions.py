@@ -0,0 +1,100 @@
+from dash import dash_table
+from dash.dash_table.Format import Format, Scheme
+import numpy as np
+import pandas as pd
+
+placement_buckets = {16: 'T16', 8: 'T8', 4: 'T4', 2: 'Finals', 1: 'Winner'}
+bucket_labels = list(placement_buckets.values())
+
+
+def tour_conversion_counts(decks):
+    """Count the decks playing each card that reached each placement bucket
+
+    Parameters
+    ----------
+    decks: list
+        Decks of one tournament as returned by `crawler.get_decklists`
+
+    Returns
+    ----------
+    conversions: dict
+        `counts` is a pd.DataFrame with one row per card, the number of
+        decks playing it and how many of those reached each bucket.
+        `totals` holds the same numbers for every deck.
+    """
+    cuts = np.array(list(placement_buckets))
+    placings = np.array([d['placing'] for d in decks])
+    totals = {'decks': len(decks)}
+    totals.update(zip(bucket_labels, (placings[:, None] <= cuts).sum(axis=0).tolist()))
+
+    raw = pd.json_normalize(decks, 'decklist', ['deck_id', 'placing'])
+    if len(raw.index) == 0:
+        return {'counts': pd.DataFrame(columns=['card_id', 'name', 'decks'] + bucket_labels), 'totals': totals}
+    raw['card_id'] = raw['set'] + '-' + raw['number']
+    raw = raw.drop_duplicates(['deck_id', 'card_id'])
+
+    reached = pd.DataFrame(
+        raw['placing'].to_numpy()[:, None] <= cuts,
+        columns=bucket_labels
+    ).astype(int)
+    reached['card_id'] = raw['card_id'].to_numpy()
+    reached['name'] = raw['name'].to_numpy()
+    reached['decks'] = 1
+    counts = reached.groupby('card_id').agg(
+        name=('name', 'first'),
+        decks=('decks', 'sum'),
+        **{b: (b, 'sum') for b in bucket_labels}
+    ).reset_index()
+    return {'counts': counts, 'totals': totals}
+
+
+def combine_conversion_counts(tour_counts):
+    """ sum the conversion counts of several tournaments """
+    counts = pd.concat([t['counts'] for t in tour_counts], ignore_index=True)
+    counts = counts.groupby('card_id').agg(
+        name=('name', 'first'),
+        decks=('decks', 'sum'),
+        **{b: (b, 'sum') for b in bucket_labels}
+    ).reset_index()
+    totals = pd.DataFrame([t['totals'] for t in tour_counts]).sum()
+    return counts, totals
+
+
+def conversion_rates(counts, totals):
+    """Fraction of decks playing each card that reached each bucket
+
+    Returns
+    ----------
+    rates: pd.DataFrame
+        One row per card with the conversion rate into each bucket
+    baseline: pd.Series
+        Conversion rate of all decks into each bucket
+    """
+    rates = counts[['card_id', 'name', 'decks']].copy()
+    rates[bucket_labels] = counts[bucket_labels].to_numpy() / counts[['decks']].to_numpy()
+    baseline = totals[bucket_labels] / totals['decks']
+    return rates, baseline
+
+
+def create_conversion_table(rates, baseline):
+    rates = rates.sort_values('decks', ascending=False)
+    rates['card'] = rates['name'] + ' ' + rates['card_id']
+    percentage = Format(precision=1, scheme=Scheme.percentage)
+    columns = [
+        {'name': ['', 'Card'], 'id': 'card'},
+        {'name': ['', 'Decks'], 'id': 'decks', 'type': 'numeric'},
+    ] + [
+        {'name': [f'Baseline {baseline[b]:.1%}', b], 'id': b, 'type': 'numeric', 'format': percentage}
+        for b in bucket_labels
+    ]
+    table = dash_table.DataTable(
+        data=rates[['card', 'decks'] + bucket_labels].to_dict('records'),
+        columns=columns,
+        merge_duplicate_headers=True,
+        sort_action='native',
+        page_size=25,
+        style_table={'overflowX': 'auto'},
+        style_cell={'textAlign': 'right'},
+        style_cell_conditional=[{'if': {'column_id': 'card'}, 'textAlign': 'left'}]
+    )
+    return table
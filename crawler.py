@@ -0,0 +1,265 @@
+# package imports
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import random
+import time
+from requests import get, RequestException
+
+import helpers
+
+# a CDN in front of upstream answers 403 when it throttles us, so it is
+# treated like a 429 rather than a permanent failure
+retry_statuses = {403, 429, 500, 502, 503, 504}
+max_retries = 5
+base_backoff = 1
+max_backoff = 60
+
+# partially crawled pages are kept long enough to resume an interrupted
+# job, but not so long that a stale tournament listing gets reused
+checkpoint_expire = 60 * 60
+checkpoint_key = 'crawl-checkpoint'
+
+
+class CrawlError(Exception):
+    """ raised when a page could not be fetched after all retries or
+    returned a status that is not worth retrying """
+
+
+class AdaptiveLimiter:
+    """Limit the number of concurrent requests
+
+    The limit grows additively while responses come back faster than
+    `target_latency` and shrinks multiplicatively when they are slow or
+    fail. The decrease is applied once per congestion window: slow or
+    failed requests that started before the last decrease are ignored, so
+    a burst of 429s across every request in flight only halves the limit
+    once. Failures also pause every request for the backoff period, so a
+    429 from upstream slows down the whole crawl and not just one request.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16, target_latency=2.0):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.in_flight = 0
+        self.paused_until = 0
+        self.last_decrease = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def decrease(self, started, factor):
+        """ shrink the limit unless it was already shrunk after `started` """
+        if started < self.last_decrease:
+            return
+        self.limit = max(self.minimum, self.limit * factor)
+        self.last_decrease = time.monotonic()
+
+    def record_success(self, started, latency):
+        if latency > self.target_latency:
+            self.decrease(started, 0.75)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+    def record_failure(self, started, backoff):
+        self.decrease(started, 0.5)
+        self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+
+
+def retry_after(resp):
+    """ seconds to wait as requested by the server, if any """
+    try:
+        return float(resp.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+class Crawler:
+    """ crawl listing and decklist pages concurrently with retries """
+
+    def __init__(self, limiter=None, timeout=helpers.request_timeout, cache=helpers.disk_cache):
+        self.limiter = limiter or AdaptiveLimiter()
+        self.timeout = timeout
+        self.cache = cache
+        # one thread per request the limiter can allow, so measured latency
+        # never includes waiting for a free thread
+        self.executor = ThreadPoolExecutor(max_workers=self.limiter.maximum)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def _request(self, url):
+        """ make a single request, returns the content or the seconds to back off """
+        await self.limiter.acquire()
+        start = time.monotonic()
+        try:
+            resp = await asyncio.get_running_loop().run_in_executor(
+                self.executor, partial(get, url, timeout=self.timeout)
+            )
+        except RequestException:
+            return None, None, start
+        finally:
+            await self.limiter.release()
+
+        if resp.status_code in retry_statuses:
+            return None, retry_after(resp), start
+        if not resp.ok:
+            raise CrawlError(f'Unable to fetch {url}, status {resp.status_code}')
+        self.limiter.record_success(start, time.monotonic() - start)
+        return resp.content, None, start
+
+    async def fetch(self, url):
+        """ fetch a page, backing off on timeouts, 403, 429 and 5xx responses """
+        for attempt in range(max_retries + 1):
+            content, wait, start = await self._request(url)
+            if content is not None:
+                return content
+            if wait is None:
+                wait = min(max_backoff, base_backoff * 2 ** attempt) * random.uniform(0.5, 1)
+            self.limiter.record_failure(start, wait)
+        raise CrawlError(f'Unable to fetch {url} after {max_retries + 1} attempts')
+
+    async def fetch_html(self, url):
+        return helpers.parse_html(await self.fetch(url))
+
+    def load_checkpoint(self, name, default):
+        return self.cache.get((checkpoint_key, name), default)
+
+    def save_checkpoint(self, name, state):
+        self.cache.set((checkpoint_key, name), state, expire=checkpoint_expire)
+
+    def clear_checkpoint(self, name):
+        self.cache.delete((checkpoint_key, name))
+
+    async def crawl_tournaments(self):
+        """ fetch every page of the tournament listing
+
+        Pages are requested in batches as wide as the current concurrency
+        limit until an empty page is found. Finished pages are checkpointed
+        so an interrupted crawl only requests the pages it is missing.
+        """
+        state = self.load_checkpoint(helpers.tour_url, {'pages': {}, 'last': None})
+        pages = state['pages']
+
+        async def fetch_page(page):
+            html = await self.fetch_html(helpers.tournaments_page_url(page))
+            tours = helpers.parse_tournaments(html)
+            pages[page] = tours
+            if len(tours) == 0 and (state['last'] is None or page < state['last']):
+                state['last'] = page
+            self.save_checkpoint(helpers.tour_url, state)
+
+        # keep going past the end until it is known, then fill in any page
+        # before it that a previous crawl did not finish
+        page = 1
+        while True:
+            batch = []
+            while len(batch) < max(1, int(self.limiter.limit)) and (state['last'] is None or page < state['last']):
+                if page not in pages:
+                    batch.append(page)
+                page += 1
+            if len(batch) == 0:
+                break
+            await asyncio.gather(*(fetch_page(p) for p in batch))
+
+        tours = []
+        for p in range(1, state['last']):
+            tours.extend(pages[p])
+        self.clear_checkpoint(helpers.tour_url)
+        return tours
+
+    async def crawl_tour_decklists(self, url):
+        """ fetch every decklist of a tournament, resuming from a checkpoint """
+        cache_key = helpers.tour_decklists_key(url)
+        decks = self.cache.get(cache_key)
+        if decks is not None:
+            return decks
+
+        decklists = self.load_checkpoint(url, {})
+        html = await self.fetch_html(url)
+        rows = [helpers.fetch_row_info(row) for row in helpers.extract_table_rows(html, 'data-table')]
+
+        async def fetch_decklist(decklist_url):
+            if decklist_url not in decklists:
+                html = await self.fetch_html(decklist_url)
+                decklists[decklist_url] = helpers.parse_decklist(html)
+                self.save_checkpoint(url, decklists)
+
+        await asyncio.gather(*(fetch_decklist(d) for _, d, _ in rows if d))
+
+        decks = []
+        for placement, decklist_url, name in rows:
+            if decklist_url:
+                decks.append(helpers.create_deck(url, placement, name, decklist_url, decklists[decklist_url]))
+            else:
+                print('Missing decklist for ', placement)
+        self.cache.set(cache_key, decks)
+        self.clear_checkpoint(url)
+        return decks
+
+    async def crawl_decklists(self, urls, on_progress=None):
+        """ fetch the decklists of several tournaments, sharing one limiter """
+        finished = 0
+
+        async def crawl(url):
+            nonlocal finished
+            decks = await self.crawl_tour_decklists(url)
+            finished += 1
+            if on_progress:
+                on_progress(finished, len(urls))
+            return decks
+
+        results = await asyncio.gather(*(crawl(url) for url in urls))
+        return dict(zip(urls, results))
+
+
+async def _get_tournaments():
+    crawler = Crawler()
+    try:
+        return await crawler.crawl_tournaments()
+    finally:
+        crawler.close()
+
+
+async def _get_decklists(urls, on_progress):
+    crawler = Crawler()
+    try:
+        return await crawler.crawl_decklists(urls, on_progress)
+    finally:
+        crawler.close()
+
+
+def get_tournaments_paginate():
+    """ crawl the full tournament listing """
+    return asyncio.run(_get_tournaments())
+
+
+def get_decklists(urls, on_progress=None):
+    """Crawl the decklists of each tournament url
+
+    Parameters
+    ----------
+    urls: list
+        Tournament urls to fetch
+    on_progress: callable
+        Called with the number of finished and total tournaments
+
+    Returns
+    ----------
+    decklists: dict
+        Tournament url to list of decks
+    """
+    return asyncio.run(_get_decklists(urls, on_progress))
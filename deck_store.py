@@ -0,0 +1,205 @@
+import datetime
+
+import conversions
+import crawler
+import helpers
+import trends
+
+listing_cache_key = 'tournament-listing'
+tour_cards_cache_key = 'tour-cards'
+tour_conversions_cache_key = 'tour-conversions'
+tour_trend_counts_cache_key = 'tour-trend-counts'
+tour_url_cache_key = 'tour-url'
+# new tournaments are only picked up once the cached listing expires
+listing_expire = 15 * 60
+
+
+def empty_store():
+    """Create the deck store data kept on the client
+
+    The decks themselves stay in the disk cache on the server; the client
+    only holds the selected tournaments and aggregates that can be updated
+    from the tournaments that enter or leave the window. Each tournament
+    keeps the deck total and card ids it added to the aggregates, so they
+    can be taken out again even if its cached index changed since.
+    """
+    return {'tours': {}, 'cards': {}, 'total': 0}
+
+
+def list_tournaments():
+    """ fetch the tournament listing, reusing it until it expires """
+    tours = helpers.disk_cache.get(listing_cache_key)
+    if tours is None:
+        tours = crawler.get_tournaments_paginate()
+        helpers.disk_cache.set(listing_cache_key, tours, expire=listing_expire)
+    return tours
+
+
+def select_tours(tours, start, end):
+    """ map the id of each tournament in the date range to its url and date """
+    selected = {}
+    for tour in tours:
+        tour_date_str = tour['date']
+        tour_date_obj = datetime.datetime.strptime(tour_date_str, '%d %b %y')
+        tour_date = tour_date_obj.strftime('%Y-%m-%d')
+        if tour_date > end or tour_date < start:
+            continue
+        selected[tour['id']] = {'url': tour['url'], 'date': tour_date}
+    return selected
+
+
+def card_id(card):
+    return f'{card.get("set")}-{card.get("number")}'
+
+
+def tour_cards(decks):
+    """ index of the cards played in a tournament """
+    cards = {}
+    for deck in decks:
+        for card in deck['decklist']:
+            id = card_id(card)
+            cards[id] = f'{card.get("name")} {id}'
+    return cards
+
+
+def get_tour_url(tour_id):
+    """Url of a tournament that was selected from the listing
+
+    The client only sends tournament ids back, urls are recorded on the
+    server by `update_store` so nothing the client sends is ever fetched.
+    """
+    return helpers.disk_cache.get((tour_url_cache_key, tour_id))
+
+
+def get_tour_decks(tour_id):
+    """ cached decks of a tournament, None if they are not cached """
+    url = get_tour_url(tour_id)
+    if url is None:
+        return None
+    return helpers.disk_cache.get(helpers.tour_decklists_key(url))
+
+
+def get_tour_index(cache_key, compute, tour_id, decks=None):
+    """Fetch a derived index of a tournament, computing it if needed
+
+    Indexes are cached by tournament url. They are computed from `decks`
+    when given, otherwise from the cached decks. None is returned when
+    neither is available; the analysis callbacks treat those tournaments
+    as missing instead of crawling them.
+    """
+    url = get_tour_url(tour_id)
+    if url is None:
+        return None
+    index = helpers.disk_cache.get((cache_key, url))
+    if index is None:
+        if decks is None:
+            decks = helpers.disk_cache.get(helpers.tour_decklists_key(url))
+        if decks is None:
+            return None
+        index = compute(decks)
+        helpers.disk_cache.set((cache_key, url), index)
+    return index
+
+
+def get_tour_cards(tour_id, decks=None):
+    return get_tour_index(
+        tour_cards_cache_key,
+        lambda decks: {'cards': tour_cards(decks), 'total': len(decks)},
+        tour_id, decks
+    )
+
+
+def get_tour_conversions(tour_id, decks=None):
+    return get_tour_index(tour_conversions_cache_key, conversions.tour_conversion_counts, tour_id, decks)
+
+
+def get_tour_trend_counts(tour_id, decks=None):
+    return get_tour_index(tour_trend_counts_cache_key, trends.tour_card_counts, tour_id, decks)
+
+
+def get_conversions(store):
+    """ conversion counts summed over every cached tournament in the store, None if there are none """
+    tour_counts = [get_tour_conversions(tour_id) for tour_id in store['tours']]
+    tour_counts = [counts for counts in tour_counts if counts is not None]
+    if len(tour_counts) == 0:
+        return None
+    return conversions.combine_conversion_counts(tour_counts)
+
+
+def get_trend_counts(store):
+    """ card counts of every cached tournament in the store with its date """
+    tour_counts = []
+    for tour_id, tour in store['tours'].items():
+        counts = get_tour_trend_counts(tour_id)
+        if counts is not None:
+            tour_counts.append(dict(counts, date=tour['date']))
+    return tour_counts
+
+
+def get_decks(store):
+    """ load the cached decks of every tournament in the store """
+    decks = []
+    for tour_id, tour in store['tours'].items():
+        tour_decks = get_tour_decks(tour_id)
+        if tour_decks is None:
+            continue
+        for deck in tour_decks:
+            deck['date'] = tour['date']
+        decks.extend(tour_decks)
+    return decks
+
+
+def update_store(store, tours, on_progress=None):
+    """Move the store to a new set of tournaments
+
+    Only the tournaments that entered or left the window are touched:
+    entered tournaments are crawled if needed, their cards added to the
+    aggregates and their trend and conversion counts precomputed, while
+    left tournaments have the cards and decks they added subtracted.
+
+    Parameters
+    ----------
+    store: dict
+        Current store as created by `empty_store`
+    tours: dict
+        Id to url and date of each tournament in the new window, as
+        returned by `select_tours`
+    on_progress: callable
+        Called with the number of finished and total entered tournaments
+
+    Returns
+    ----------
+    store: dict
+        Store for the new window
+    """
+    entered = [tour_id for tour_id in tours if tour_id not in store['tours']]
+    left = [tour_id for tour_id in store['tours'] if tour_id not in tours]
+    for tour_id, tour in tours.items():
+        helpers.disk_cache.set((tour_url_cache_key, tour_id), tour['url'])
+
+    window = {tour_id: store['tours'][tour_id] for tour_id in tours if tour_id in store['tours']}
+    cards = {id: dict(card) for id, card in store['cards'].items()}
+    total = store['total']
+
+    for tour_id in left:
+        tour = store['tours'][tour_id]
+        total -= tour['total']
+        for id in tour['cards']:
+            cards[id]['tours'] -= 1
+            if cards[id]['tours'] == 0:
+                del cards[id]
+
+    entered_decks = crawler.get_decklists([tours[tour_id]['url'] for tour_id in entered], on_progress)
+    for tour_id in entered:
+        decks = entered_decks[tours[tour_id]['url']]
+        index = get_tour_cards(tour_id, decks)
+        get_tour_trend_counts(tour_id, decks)
+        get_tour_conversions(tour_id, decks)
+        total += index['total']
+        for id, label in index['cards'].items():
+            if id not in cards:
+                cards[id] = {'label': label, 'tours': 0}
+            cards[id]['tours'] += 1
+        window[tour_id] = {'date': tours[tour_id]['date'], 'total': index['total'], 'cards': list(index['cards'])}
+
+    return {'tours': window, 'cards': cards, 'total': total}
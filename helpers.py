@@ -1,16 +1,16 @@
 # package imports
 from bs4 import BeautifulSoup
-from cachetools import cached
-from contextlib import closing
-from diskcache import Cache
+from cachetools.keys import hashkey
 import pandas as pd
-from requests import get, post
+from requests import post
 
-cache_dir = ".cache"
-disk_cache = Cache(cache_dir)
+import caches
+
+disk_cache = caches.scraped_cache
 
 base_url = 'https://limitlesstcg.com'
 tour_url = f'{base_url}/tournaments/jp?show=100'
+request_timeout = 20
 
 
 def card_raw_to_id(set_code, number):
@@ -41,10 +41,9 @@ def card_raw_to_id(set_code, number):
     return f'{set_code}-{num_int}'
 
 
-def get_html(url):
-    """ scrapes a webpage and returns the beautified soup """
-    with closing(get(url, stream=True)) as resp:
-        return BeautifulSoup(resp.content, 'html.parser')
+def parse_html(content):
+    """ returns the beautified soup of raw page content """
+    return BeautifulSoup(content, 'html.parser')
 
 
 def extract_table_rows(html, class_name):
@@ -74,9 +73,8 @@ def fetch_row_info(row):
     return placement, decklist_url, name
 
 
-def fetch_decklist(url):
-    """ fetch a decklist from a given url """
-    html = get_html(url)
+def parse_decklist(html):
+    """ extract the cards from a decklist page """
     soup_cards = html.findAll('div', {'class': 'decklist-card'})
     cards = []
     for soup_card in soup_cards:
@@ -91,9 +89,11 @@ def fetch_decklist(url):
     return cards
 
 
-def get_tournaments(page=1):
-    paged_url = f'{tour_url}&page={page}'
-    tours_html = get_html(paged_url)
+def tournaments_page_url(page):
+    return f'{tour_url}&page={page}'
+
+
+def parse_tournaments(tours_html):
     tour_rows = extract_table_rows(tours_html, 'data-table')
     tours = []
     for row in tour_rows:
@@ -102,49 +102,24 @@ def get_tournaments(page=1):
     return tours
 
 
-def get_tournaments_paginate():
-    page = 1
-    tours = []
-    while True:
-        paged_tours = get_tournaments(page)
-        if len(paged_tours) == 0:
-            break
-        tours.extend(paged_tours)
-        page += 1
-    return tours
-
+def tour_decklists_key(url):
+    """ disk cache key of the decks of a tournament
 
-@cached(cache=disk_cache)
-def get_tour_decklists(url):
-    html = get_html(url)
-    rows = extract_table_rows(html, 'data-table')
-
-    decks = []
-    for row in rows:
-        placement, decklist_url, name = fetch_row_info(row)
-        if decklist_url:
-            decklist = fetch_decklist(decklist_url)
-            decks.append(
-                {
-                    'placing': placement,
-                    'name': name,
-                    'player': name,
-                    'decklist': decklist,
-                    'tour_id': url.split('/')[-1],
-                    'deck_id': decklist_url.split('/')[-1]
-                }
-            )
-        else:
-            print('Missing decklist for ', placement)
-    return decks
+    Matches the key of the old cachetools wrapper so tournaments cached
+    before the crawler was added are still found.
+    """
+    return hashkey(url)
 
 
-def get_decklists(urls):
-    overall = []
-    for url in urls:
-        decklists = get_tour_decklists(url)
-        overall.extend(decklists)
-    return overall
+def create_deck(url, placement, name, decklist_url, decklist):
+    return {
+        'placing': placement,
+        'name': name,
+        'player': name,
+        'decklist': decklist,
+        'tour_id': url.split('/')[-1],
+        'deck_id': decklist_url.split('/')[-1]
+    }
 
 
 def get_deck_from_limitless(decklist):
@@ -263,15 +238,12 @@ def placement_analysis(decks):
 
 
 if __name__ == '__main__':
-    tours = get_tournaments()
+    import crawler
+    tours = crawler.get_tournaments_paginate()
+    decklists = crawler.get_decklists([tour['url'] for tour in tours])
     for tour in tours:
         print(tour)
-        decks = get_tour_decklists(tour['url'])
-        tour['decklists'] = decks
-        # for deck in decks:
-        #     print(deck)
-        #     break
-        # break
+        tour['decklists'] = decklists[tour['url']]
     import datetime
     import json
     with open(f'{datetime.datetime.now()}_city_league_dump.json', 'w') as f:
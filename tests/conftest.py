@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# keep test caches out of the working directory, this has to happen
+# before `caches` is imported
+cache_root = tempfile.mkdtemp()
+os.environ.setdefault('SCRAPED_CACHE_DIR', os.path.join(cache_root, 'scraped'))
+os.environ.setdefault('JOB_CACHE_DIR', os.path.join(cache_root, 'jobs'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,147 @@
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import random
+import threading
+import time
+
+import pytest
+
+import crawler
+import helpers
+
+listing_pages = 3
+tours_per_page = 5
+decks_per_tour = 8
+
+
+class FakeLimitless(BaseHTTPRequestHandler):
+    """ serves listing, tournament and decklist pages with injected latency and errors """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(random.uniform(0.01, 0.05))
+        path = self.path
+        if path in server.blocked or random.random() < server.error_rate:
+            code = 503 if path in server.blocked else random.choice([429, 500, 503])
+            self.send_response(code)
+            if code == 429:
+                self.send_header('Retry-After', '0.05')
+            self.end_headers()
+            return
+
+        if path.startswith('/missing'):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        with server.lock:
+            server.served[path] += 1
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(self.body(path).encode())
+
+    def body(self, path):
+        base = self.server.base
+        if path.startswith('/tournaments/jp?'):
+            page = int(path.split('page=')[-1])
+            rows = ''
+            if page <= listing_pages:
+                for i in range(tours_per_page):
+                    tour_id = page * 100 + i
+                    rows += f'<tr><td>0{i + 1} Feb 24</td><td></td><td><a href="{base}/tournaments/jp/{tour_id}">Tour {tour_id}</a></td></tr>'
+        elif path.startswith('/tournaments/jp/'):
+            tour_id = path.split('/')[-1]
+            rows = ''.join(
+                f'<tr><td>{i + 1}</td><td>Player {i}</td><td><a href="{base}/decks/list/{tour_id}-{i}">list</a></td></tr>'
+                for i in range(decks_per_tour)
+            )
+        else:
+            return '<div class="decklist-card" data-number="1" data-set="SV1">' \
+                '<span class="card-count">4</span><span class="card-name">Pikachu</span></div>'
+        return f'<table class="data-table"><tr><th></th></tr>{rows}</table>'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeLimitless)
+    server.base = f'http://127.0.0.1:{server.server_address[1]}'
+    server.error_rate = 0.15
+    server.blocked = set()
+    server.served = Counter()
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(helpers, 'tour_url', f'{server.base}/tournaments/jp?show=100')
+    monkeypatch.setattr(crawler, 'base_backoff', 0.05)
+    helpers.disk_cache.clear()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_crawl_is_complete_despite_errors(server):
+    tours = crawler.get_tournaments_paginate()
+    assert len(tours) == listing_pages * tours_per_page
+
+    urls = [tour['url'] for tour in tours]
+    decklists = crawler.get_decklists(urls)
+    assert list(decklists) == urls
+    for decks in decklists.values():
+        assert [d['placing'] for d in decks] == list(range(1, decks_per_tour + 1))
+        assert decks[0]['decklist'] == [{'number': '1', 'set': 'SV1', 'count': 4, 'name': 'Pikachu'}]
+
+    # finished crawls do not leave checkpoints behind
+    assert helpers.disk_cache.get((crawler.checkpoint_key, helpers.tour_url)) is None
+    assert all(helpers.disk_cache.get((crawler.checkpoint_key, url)) is None for url in urls)
+
+
+def test_interrupted_crawl_resumes_from_checkpoint(server, monkeypatch):
+    server.error_rate = 0
+    tour_url = f'{server.base}/tournaments/jp/100'
+    server.blocked.add('/decks/list/100-0')
+    monkeypatch.setattr(crawler, 'max_retries', 2)
+    with pytest.raises(crawler.CrawlError):
+        crawler.get_decklists([tour_url])
+
+    checkpoint = helpers.disk_cache.get((crawler.checkpoint_key, tour_url))
+    assert checkpoint
+    assert f'{server.base}/decks/list/100-0' not in checkpoint
+    fetched = Counter(server.served)
+
+    server.blocked.clear()
+    server.error_rate = 0.15
+    monkeypatch.setattr(crawler, 'max_retries', 5)
+    decks = crawler.get_decklists([tour_url])[tour_url]
+    assert len(decks) == decks_per_tour
+
+    for decklist_url in checkpoint:
+        path = decklist_url[len(server.base):]
+        assert server.served[path] == fetched[path] == 1
+    assert server.served['/decks/list/100-0'] == 1
+    assert helpers.disk_cache.get((crawler.checkpoint_key, tour_url)) is None
+
+
+def test_missing_page_raises_crawl_error(server):
+    server.error_rate = 0
+    with pytest.raises(crawler.CrawlError, match='status 404'):
+        crawler.get_decklists([f'{server.base}/missing'])
+
+
+def test_interrupted_listing_keeps_finished_pages(server, monkeypatch):
+    server.error_rate = 0
+    server.blocked.add('/tournaments/jp?show=100&page=2')
+    monkeypatch.setattr(crawler, 'max_retries', 2)
+    with pytest.raises(crawler.CrawlError):
+        crawler.get_tournaments_paginate()
+
+    checkpoint = helpers.disk_cache.get((crawler.checkpoint_key, helpers.tour_url))
+    assert set(checkpoint['pages']) >= {1, 3}
+    assert 2 not in checkpoint['pages']
+
+    server.blocked.clear()
+    tours = crawler.get_tournaments_paginate()
+    assert len(tours) == listing_pages * tours_per_page
+    assert server.served['/tournaments/jp?show=100&page=1'] == 1
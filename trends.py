@@ -0,0 +1,88 @@
+import pandas as pd
+import plotly.express as px
+
+default_trend_cards = 10
+
+
+def tour_card_counts(decks):
+    """Count how many decks play each card in a tournament
+
+    Every deck is handled in a single normalize and groupby pass.
+
+    Parameters
+    ----------
+    decks: list
+        Decks of one tournament as returned by `crawler.get_decklists`
+
+    Returns
+    ----------
+    counts: dict
+        `counts` is a pd.DataFrame with one row per card and the number of
+        decks that played it, `total` is the number of decks
+    """
+    raw = pd.json_normalize(decks, 'decklist', ['deck_id'])
+    if len(raw.index) == 0:
+        return {'counts': pd.DataFrame(columns=['card_id', 'name', 'decks']), 'total': len(decks)}
+    raw['card_id'] = raw['set'] + '-' + raw['number']
+    counts = raw.groupby('card_id').agg(
+        name=('name', 'first'),
+        decks=('deck_id', 'nunique')
+    ).reset_index()
+    return {'counts': counts, 'total': len(decks)}
+
+
+def compute_trends(tour_counts, freq='D'):
+    """Compute the play rate of each card over time
+
+    Parameters
+    ----------
+    tour_counts: list
+        Card counts of each tournament with its `date`, as returned by
+        `deck_store.get_trend_counts`
+    freq: str
+        Pandas period alias to bucket tournaments by, `D` or `W`
+
+    Returns
+    ----------
+    trend: pd.DataFrame
+        One row per period and card with `decks`, `total` and `play_rate`
+    """
+    played = [t['counts'].assign(date=t['date']) for t in tour_counts if len(t['counts'].index) > 0]
+    if len(played) == 0:
+        return pd.DataFrame(columns=['period', 'card_id', 'name', 'decks', 'total', 'play_rate'])
+    counts = pd.concat(played, ignore_index=True)
+    totals = pd.DataFrame([{'date': t['date'], 'total': t['total']} for t in tour_counts])
+
+    counts['period'] = pd.to_datetime(counts['date']).dt.to_period(freq).dt.start_time
+    totals['period'] = pd.to_datetime(totals['date']).dt.to_period(freq).dt.start_time
+    totals = totals.groupby('period')['total'].sum()
+    trend = counts.groupby(
+        ['period', 'card_id']
+    ).agg(
+        name=('name', 'first'),
+        decks=('decks', 'sum')
+    ).reset_index()
+    trend['total'] = trend['period'].map(totals)
+    trend['play_rate'] = trend['decks'] / trend['total']
+    return trend
+
+
+def create_trend_graph(trend, cards):
+    if len(cards) == 0:
+        overall = trend.groupby('card_id')['decks'].sum()
+        cards = overall.nlargest(default_trend_cards).index.tolist()
+    names = trend.drop_duplicates('card_id').set_index('card_id')['name']
+
+    # cards not played in a period still need a 0 point on the graph
+    df = trend[trend['card_id'].isin(cards)].pivot(
+        index='period', columns='card_id', values='play_rate'
+    ).reindex(
+        index=trend['period'].unique(), columns=[c for c in cards if c in names.index]
+    ).fillna(0).sort_index()
+    df = df.reset_index().melt(id_vars='period', var_name='card_id', value_name='play_rate')
+    df['card'] = df['card_id'].map(names) + ' ' + df['card_id']
+
+    fig = px.line(df, x='period', y='play_rate', color='card', markers=True, title='Play rate over time')
+    fig.update_xaxes(fixedrange=True, title='Date')
+    fig.update_yaxes(fixedrange=True, range=[0, 1.05], tickformat='.0%', title='Play rate')
+    return fig